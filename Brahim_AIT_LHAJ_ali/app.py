@@ -6,14 +6,21 @@ Uses data.json as a curated ingredient knowledge base:
   3. Matched knowledge is sent back to Gemini for a grounded health report.
 """
 
+import hashlib
+import io
 import os
 import json
 import re
 import traceback
-from difflib import SequenceMatcher
 
+import ahocorasick
+import orjson
+from cachetools import TTLCache
+import numpy as np
 from flask import Flask, request, jsonify, render_template
 from dotenv import load_dotenv
+from rapidfuzz import process, fuzz, utils
+from PIL import Image
 import google.generativeai as genai
 
 # ---------------------------------------------------------------------------
@@ -30,9 +37,32 @@ if not GOOGLE_API_KEY:
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
+# One model instance and one config per pass for the lifetime of the
+# process — construction is per-request overhead, and a shared client
+# keeps the underlying HTTPS connection pool warm
+GEMINI_MODEL = genai.GenerativeModel("gemini-2.5-flash")
+
+EXTRACT_CONFIG = genai.types.GenerationConfig(
+    temperature=0.1,
+    max_output_tokens=2048,
+    response_mime_type="application/json",
+)
+
+ANALYSIS_CONFIG = genai.types.GenerationConfig(
+    temperature=0.3,
+    max_output_tokens=4096,
+    response_mime_type="application/json",
+)
+
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
 MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB
 
+# In-memory caches keyed by image hash: re-uploading the same label skips
+# the Gemini round trips entirely (final result) or at least pass 1
+# (extracted ingredient list) if only the analysis needs re-running.
+RESULT_CACHE = TTLCache(maxsize=512, ttl=3600)
+EXTRACT_CACHE = TTLCache(maxsize=512, ttl=3600)
+
 # ---------------------------------------------------------------------------
 # Load ingredient knowledge base (data.json)
 # ---------------------------------------------------------------------------
@@ -48,6 +78,16 @@ for entry in INGREDIENT_DB:
     key = entry["ingredient"].lower().strip()
     INGREDIENT_LOOKUP[key] = entry
 
+# Frozen key list so rapidfuzz can score against the whole DB in one C++ call
+KEYS = list(INGREDIENT_LOOKUP.keys())
+
+# Aho-Corasick automaton over all DB keys: finds every key contained in a
+# query string in O(len(query)), no matter how large the DB grows
+INGREDIENT_AUTOMATON = ahocorasick.Automaton()
+for key, entry in INGREDIENT_LOOKUP.items():
+    INGREDIENT_AUTOMATON.add_word(key, (key, entry))
+INGREDIENT_AUTOMATON.make_automaton()
+
 print(f"[RAG] Loaded {len(INGREDIENT_DB)} ingredients into knowledge base.")
 
 # ---------------------------------------------------------------------------
@@ -142,10 +182,22 @@ def build_analysis_prompt(ingredients_from_label, matched_knowledge, unmatched_n
 # ---------------------------------------------------------------------------
 # RAG: Fuzzy matching engine
 # ---------------------------------------------------------------------------
-def fuzzy_match_ingredient(name, threshold=0.65):
+def _containment_match(normalised):
+    """Return the record of the longest DB key contained in the query, or None."""
+    best_key = None
+    best_record = None
+    for _, (key, record) in INGREDIENT_AUTOMATON.iter(normalised):
+        if best_key is None or len(key) > len(best_key):
+            best_key = key
+            best_record = record
+    return best_record
+
+
+def fuzzy_match_ingredient(name, threshold=65):
     """
     Match an extracted ingredient name against the knowledge base.
-    Uses exact match first, then fuzzy substring/sequence matching.
+    Uses exact match first, then substring containment via Aho-Corasick,
+    then rapidfuzz WRatio scoring (0-100 scale).
     Returns the matched record or None.
     """
     normalised = name.lower().strip()
@@ -154,23 +206,21 @@ def fuzzy_match_ingredient(name, threshold=0.65):
     if normalised in INGREDIENT_LOOKUP:
         return INGREDIENT_LOOKUP[normalised]
 
-    # 2. Check if any DB key is contained in the name, or vice versa
-    for key, record in INGREDIENT_LOOKUP.items():
-        # Substring containment (either direction)
-        if key in normalised or normalised in key:
-            return record
-
-    # 3. Fuzzy sequence matching
-    best_score = 0
-    best_record = None
-    for key, record in INGREDIENT_LOOKUP.items():
-        score = SequenceMatcher(None, normalised, key).ratio()
-        if score > best_score:
-            best_score = score
-            best_record = record
-
-    if best_score >= threshold:
-        return best_record
+    # 2. Substring containment: scan the query once against the automaton
+    record = _containment_match(normalised)
+    if record is not None:
+        return record
+
+    # 3. Fuzzy matching against all DB keys in a single vectorized call
+    match = process.extractOne(
+        normalised,
+        KEYS,
+        scorer=fuzz.WRatio,
+        processor=utils.default_process,
+        score_cutoff=threshold,
+    )
+    if match:
+        return INGREDIENT_LOOKUP[match[0]]
 
     return None
 
@@ -185,13 +235,41 @@ def retrieve_knowledge(ingredient_names):
     unmatched = []
     seen_ids = set()
 
+    # Exact and containment matches are cheap (dict probe + one automaton
+    # scan per name); collect the rest for batch fuzzy scoring
+    pending = []
     for name in ingredient_names:
-        record = fuzzy_match_ingredient(name)
-        if record and record["id"] not in seen_ids:
-            matched.append(record)
-            seen_ids.add(record["id"])
-        elif record is None:
-            unmatched.append(name)
+        normalised = name.lower().strip()
+        record = INGREDIENT_LOOKUP.get(normalised)
+        if record is None:
+            record = _containment_match(normalised)
+        if record is not None:
+            if record["id"] not in seen_ids:
+                matched.append(record)
+                seen_ids.add(record["id"])
+        else:
+            pending.append(name)
+
+    if pending:
+        # Score all remaining names against all DB keys in one vectorized
+        # C++ call (M x N matrix) instead of M separate Python loops
+        scores = process.cdist(
+            pending,
+            KEYS,
+            scorer=fuzz.WRatio,
+            processor=utils.default_process,
+            score_cutoff=65,
+            workers=-1,
+        )
+        best_idx = np.argmax(scores, axis=1)
+        for name, row, col in zip(pending, scores, best_idx):
+            if row[col] >= 65:
+                record = INGREDIENT_LOOKUP[KEYS[col]]
+                if record["id"] not in seen_ids:
+                    matched.append(record)
+                    seen_ids.add(record["id"])
+            else:
+                unmatched.append(name)
 
     return matched, unmatched
 
@@ -203,21 +281,52 @@ def _allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _prepare_image(image_bytes, mime_type):
+    """
+    Downscale the uploaded photo to at most 1024 px per edge and re-encode
+    as JPEG. Ingredient text stays readable at that size, and the smaller
+    payload cuts both upload time and Gemini's vision-encoder cost.
+    Falls back to the original bytes if Pillow cannot decode the file.
+    """
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        img.thumbnail((1024, 1024))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=85, optimize=True)
+        return buf.getvalue(), "image/jpeg"
+    except Exception:
+        return image_bytes, mime_type
+
+
+# Precompiled fallback patterns for _parse_json_response
+_FENCE_RE = re.compile(r"```(?:json)?\s*\n?(.*?)\n?\s*```", re.DOTALL)
+_BRACE_RE = re.compile(r"[\{\[].*[\}\]]", re.DOTALL)
+
+
 def _parse_json_response(raw_text):
     """Robustly extract JSON from Gemini's response."""
+    # Fast path: with response_mime_type="application/json" the response is
+    # usually clean JSON already — parse directly, no regex involved
+    try:
+        return orjson.loads(raw_text)
+    except orjson.JSONDecodeError:
+        pass
+
     # 1. Try stripping ```json ... ``` fences
-    fence_match = re.search(r"```(?:json)?\s*\n?(.*?)\n?\s*```", raw_text, re.DOTALL)
+    fence_match = _FENCE_RE.search(raw_text)
     if fence_match:
         json_str = fence_match.group(1).strip()
     else:
         # 2. Try to find a JSON object or array anywhere in the text
-        brace_match = re.search(r"[\{\[].*[\}\]]", raw_text, re.DOTALL)
+        brace_match = _BRACE_RE.search(raw_text)
         if brace_match:
             json_str = brace_match.group(0).strip()
         else:
             json_str = raw_text
 
-    return json.loads(json_str)
+    return orjson.loads(json_str)
 
 
 # ---------------------------------------------------------------------------
@@ -235,6 +344,10 @@ def analyze():
       1. Extract ingredients from label via Gemini Vision
       2. Retrieve matching knowledge from data.json
       3. Generate grounded health report via Gemini
+
+    The Gemini round trips dominate wall time; serve under a threaded or
+    gevent WSGI server (e.g. gunicorn -k gevent) so other requests keep
+    flowing while a worker waits on the network.
     """
 
     if "image" not in request.files:
@@ -252,34 +365,43 @@ def analyze():
         image_bytes = file.read()
         mime_type = file.content_type or "image/jpeg"
 
+        # Cache key: same image bytes → same analysis
+        image_key = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+        cached_result = RESULT_CACHE.get(image_key)
+        if cached_result is not None:
+            print("[RAG] Cache hit: returning stored analysis.")
+            return jsonify(cached_result)
+
+        # Shrink the payload before it goes over the wire (twice)
+        image_bytes, mime_type = _prepare_image(image_bytes, mime_type)
+
         image_part = {
             "mime_type": mime_type,
             "data": image_bytes,
         }
 
-        model = genai.GenerativeModel("gemini-2.5-flash")
-
         # ── PASS 1: Extract ingredients from the image ──────────────────
-        print("[RAG] Pass 1: Extracting ingredients from label...")
-        extract_response = model.generate_content(
-            [EXTRACT_PROMPT, image_part],
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1,
-                max_output_tokens=2048,
-                response_mime_type="application/json",
-            ),
-        )
+        ingredients_list = EXTRACT_CACHE.get(image_key)
+        if ingredients_list is None:
+            print("[RAG] Pass 1: Extracting ingredients from label...")
+            extract_response = GEMINI_MODEL.generate_content(
+                [EXTRACT_PROMPT, image_part],
+                generation_config=EXTRACT_CONFIG,
+            )
 
-        raw_extract = extract_response.text.strip()
-        print(f"[RAG] Extracted raw: {raw_extract[:500]}")
+            raw_extract = extract_response.text.strip()
+            print(f"[RAG] Extracted raw: {raw_extract[:500]}")
 
-        ingredients_list = _parse_json_response(raw_extract)
+            ingredients_list = _parse_json_response(raw_extract)
 
-        if not isinstance(ingredients_list, list):
-            ingredients_list = []
+            if not isinstance(ingredients_list, list):
+                ingredients_list = []
 
-        # Clean up: ensure all items are strings
-        ingredients_list = [str(i).strip() for i in ingredients_list if i]
+            # Clean up: ensure all items are strings
+            ingredients_list = [str(i).strip() for i in ingredients_list if i]
+            EXTRACT_CACHE[image_key] = ingredients_list
+        else:
+            print("[RAG] Pass 1 cache hit: reusing extracted ingredients.")
         print(f"[RAG] Found {len(ingredients_list)} ingredients: {ingredients_list}")
 
         # ── RETRIEVAL: Match against data.json ──────────────────────────
@@ -295,13 +417,9 @@ def analyze():
         )
         print("[RAG] Pass 2: Generating augmented health report...")
 
-        analysis_response = model.generate_content(
+        analysis_response = GEMINI_MODEL.generate_content(
             [analysis_prompt, image_part],
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.3,
-                max_output_tokens=4096,
-                response_mime_type="application/json",
-            ),
+            generation_config=ANALYSIS_CONFIG,
         )
 
         raw_analysis = analysis_response.text.strip()
@@ -323,6 +441,8 @@ def analyze():
             "ingredients_extracted": ingredients_list,
         }
 
+        RESULT_CACHE[image_key] = result
+
         return jsonify(result)
 
     except json.JSONDecodeError:
@@ -1,4 +1,6 @@
 # Import necessary libraries
+from functools import lru_cache
+
 import numpy as np
 import nltk
 # Uncomment the line below if 'punkt' is not already downloaded
@@ -22,9 +24,12 @@ def tokenize(sentence):
     # Use NLTK's word_tokenize to split the sentence into words/tokens
     return nltk.word_tokenize(sentence)
 
+@lru_cache(maxsize=None)
 def stem(word):
     """
     Stemming: Find the root form of the word.
+    Results are memoized: the Porter algorithm is slow and the same
+    tokens repeat constantly across patterns and messages.
     Examples:
     words = ["organize", "organizes", "organizing"]
     words = [stem(w) for w in words]
@@ -39,30 +44,30 @@ def stem(word):
     # Convert the word to lowercase and then stem it
     return stemmer.stem(word.lower())
 
-def bag_of_words(tokenized_sentence, words):
+def bag_of_words(tokenized_sentence, word_to_idx):
     """
     Return bag of words array:
     1 for each known word that exists in the sentence, 0 otherwise.
-    
+
     Example:
     sentence = ["hello", "how", "are", "you"]
-    words = ["hi", "hello", "I", "you", "bye", "thank", "cool"]
+    word_to_idx = {"hi": 0, "hello": 1, "I": 2, "you": 3, "bye": 4, "thank": 5, "cool": 6}
     bag   = [  0 ,    1 ,    0 ,   1 ,    0 ,    0 ,      0]
-    
+
     Parameters:
     tokenized_sentence (list): The sentence that has been tokenized into a list of words.
-    words (list): The list of known words.
-    
+    word_to_idx (dict): Mapping from known word to its position in the vocabulary.
+
     Returns:
     np.array: A bag of words array.
     """
-    # Stem each word in the tokenized sentence
-    sentence_words = [stem(word) for word in tokenized_sentence]
     # Initialize the bag with 0 for each known word
-    bag = np.zeros(len(words), dtype=np.float32)
-    # Mark the presence of known words in the sentence
-    for idx, w in enumerate(words):
-        if w in sentence_words: 
-            bag[idx] = 1
+    bag = np.zeros(len(word_to_idx), dtype=np.float32)
+    # Only iterate the (short) sentence and probe the dict per word,
+    # instead of scanning the whole vocabulary per sentence
+    for word in tokenized_sentence:
+        idx = word_to_idx.get(stem(word))
+        if idx is not None:
+            bag[idx] = 1.0
 
     return bag
\ No newline at end of file
@@ -3,13 +3,12 @@ import numpy as np
 import json
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
 
 import nltk
 nltk.download('punkt_tab')
 
 # Import custom utilities for text processing and the neural network model
-from nltk_utils import bag_of_words, tokenize, stem
+from nltk_utils import tokenize, stem
 from model import NeuralNet
 
 # Load the intents JSON file which contains the training data
@@ -42,18 +41,18 @@ print(len(xy), "patterns")
 print(len(tags), "tags:", tags)
 print(len(all_words), "unique stemmed words:", all_words)
 
-# Create training data in the form of bag-of-words vectors and corresponding labels
-X_train = []
-y_train = []
-for (pattern_sentence, tag) in xy:
-    bag = bag_of_words(pattern_sentence, all_words)  # Create a bag of words for each sentence
-    X_train.append(bag)  # Add the bag of words to the training data
-    label = tags.index(tag)  # Get the index of the tag
-    y_train.append(label)  # Add the label to the training data
+# Precompute the word -> vocabulary index and tag -> label mappings
+word_to_idx = {w: i for i, w in enumerate(all_words)}
+tag_to_idx = {t: i for i, t in enumerate(tags)}
 
-# Convert training data to numpy arrays
-X_train = np.array(X_train)
-y_train = np.array(y_train)
+# Build the full training matrix in one preallocated array: scatter the
+# vocabulary indices of each pattern instead of appending per-sample bags
+X_train = np.zeros((len(xy), len(all_words)), dtype=np.float32)
+y_train = np.zeros(len(xy), dtype=np.int64)
+for s, (pattern_sentence, tag) in enumerate(xy):
+    idxs = [word_to_idx[stem(w)] for w in pattern_sentence if stem(w) in word_to_idx]
+    X_train[s, idxs] = 1.0
+    y_train[s] = tag_to_idx[tag]
 
 # Define hyperparameters for the neural network
 num_epochs = 2000
@@ -64,35 +63,23 @@ hidden_size = 7  # Size of hidden layer
 output_size = len(tags)  # Size of output layer (number of tags)
 print(input_size, output_size)
 
-# Define a custom dataset class for loading the training data
-class ChatDataset(Dataset):
-
-    def __init__(self):
-        self.n_samples = len(X_train)  # Number of samples
-        self.x_data = X_train  # Feature data
-        self.y_data = y_train  # Label data
-
-    # Support indexing such that dataset[i] can be used to get the i-th sample
-    def __getitem__(self, index):
-        return self.x_data[index], self.y_data[index]
-
-    # Return the size of the dataset
-    def __len__(self):
-        return self.n_samples
-
-# Create a dataset and a dataloader for batching and shuffling the data
-dataset = ChatDataset()
-train_loader = DataLoader(dataset=dataset,
-                          batch_size=batch_size,
-                          shuffle=True,
-                          num_workers=0)
-
 # Set the device to GPU if available, otherwise use CPU
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
+# The dataset is tiny, so keep the whole thing resident on the device and
+# slice batches directly — no DataLoader/collate/worker overhead per batch
+n_samples = len(X_train)
+Xg = torch.from_numpy(X_train).to(device)
+yg = torch.from_numpy(y_train).long().to(device)
+
 # Initialize the neural network model
 model = NeuralNet(input_size, hidden_size, output_size).to(device)
 
+# Compile the fixed 3-layer forward into fused kernels where supported
+# (PyTorch >= 2.0). Parameters are shared with `model`, so saving
+# model.state_dict() below is unaffected.
+compiled_model = torch.compile(model) if hasattr(torch, "compile") else model
+
 # Set the loss function and optimizer
 criterion = nn.CrossEntropyLoss()  # Loss function
 optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)  # Optimizer
@@ -102,12 +89,15 @@ epo_list = []
 loss_list = []
 
 for epoch in range(num_epochs):
-    for (words, labels) in train_loader:
-        words = words.to(device)
-        labels = labels.to(dtype=torch.long).to(device)
-        
+    # Shuffle indices on-device and slice minibatches from the resident tensors
+    perm = torch.randperm(n_samples, device=device)
+    for i in range(0, n_samples, batch_size):
+        idx = perm[i:i + batch_size]
+        words = Xg[idx]
+        labels = yg[idx]
+
         # Forward pass: compute predicted outputs by passing inputs to the model
-        outputs = model(words)
+        outputs = compiled_model(words)
         
         # Calculate the loss
         loss = criterion(outputs, labels)
@@ -128,6 +118,15 @@ print(epo_list)
 
 print(f'final loss: {loss.item():.4f}')
 
+# Exact-match table: stemmed token set of each training pattern -> tag.
+# chat.py probes this before running the model so canned phrases skip
+# inference entirely. Keys are sorted tuples, not frozensets, so the
+# file stays loadable under torch.load's weights_only default.
+pattern_hash_to_tag = {
+    tuple(sorted({stem(w) for w in pattern_sentence})): tag
+    for (pattern_sentence, tag) in xy
+}
+
 # Save the trained model
 data = {
 "model_state": model.state_dict(),
@@ -135,10 +134,26 @@ data = {
 "hidden_size": hidden_size,
 "output_size": output_size,
 "all_words": all_words,
-"tags": tags
+"tags": tags,
+"pattern_hash_to_tag": pattern_hash_to_tag
 }
 
 FILE = "data.pth"
 torch.save(data, FILE)
 
-print(f'training complete. file saved to {FILE}')
\ No newline at end of file
+print(f'training complete. file saved to {FILE}')
+
+# Export the trained MLP to ONNX so chat.py can serve it through
+# onnxruntime's fused C++ kernels instead of eager PyTorch
+ONNX_FILE = "model.onnx"
+torch.onnx.export(
+    model.to('cpu'),
+    torch.zeros(1, input_size),
+    ONNX_FILE,
+    opset_version=17,
+    input_names=["x"],
+    output_names=["logits"],
+    dynamic_axes={"x": {0: "b"}},
+)
+
+print(f'onnx export complete. file saved to {ONNX_FILE}')
\ No newline at end of file
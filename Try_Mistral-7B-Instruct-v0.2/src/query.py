@@ -1,15 +1,47 @@
 from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.vector_stores.faiss import FaissVectorStore
+import faiss
+
 from src.config import configure
 
 INDEX_DIR = "storage"
 
-def ask(question: str):
-    configure()
 
-    storage_context = StorageContext.from_defaults(persist_dir=INDEX_DIR)
-    index = load_index_from_storage(storage_context)
+def _move_index_to_gpu(vector_store):
+    # Only possible with a faiss-gpu build and at least one CUDA device
+    if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+        return
+    try:
+        res = faiss.StandardGpuResources()
+        vector_store._faiss_index = faiss.index_cpu_to_gpu(res, 0, vector_store.client)
+    except RuntimeError as exc:
+        # Not every index type has a GPU implementation (the fast-scan and
+        # FP16 scalar-quantizer indexes built by ingest.py do not); keep the
+        # CPU index in that case
+        print(f"FAISS index stays on CPU: {exc}")
+
+
+# Built once on first use; repeated ask() calls only pay for the query itself
+_query_engine = None
+
 
-    query_engine = index.as_query_engine()
+def _get_query_engine():
+    global _query_engine
+    if _query_engine is None:
+        configure()
 
-    response = query_engine.query(question)
+        vector_store = FaissVectorStore.from_persist_dir(INDEX_DIR)
+        _move_index_to_gpu(vector_store)
+
+        storage_context = StorageContext.from_defaults(
+            vector_store=vector_store, persist_dir=INDEX_DIR
+        )
+        index = load_index_from_storage(storage_context)
+
+        _query_engine = index.as_query_engine()
+    return _query_engine
+
+
+def ask(question: str):
+    response = _get_query_engine().query(question)
     return response